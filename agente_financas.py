@@ -2,11 +2,126 @@ import streamlit as st
 from langgraph.graph import Graph
 from langchain_core.messages import HumanMessage, AIMessage
 from typing import Dict, TypedDict, Optional
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 import yfinance as yf
 import pandas as pd
-import plotly.express as px
-from datetime import datetime, timedelta
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import plotly.graph_objects as go
+import diskcache
+import hashlib
+import json
+import logging
+import re
+import requests
+from datetime import date, datetime, timedelta
+
+try:
+    from curl_cffi import requests as curl_requests
+except ImportError:
+    curl_requests = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# Cache em disco das respostas do Yahoo Finance (sobrevive aos reruns do Streamlit)
+@st.cache_resource
+def _obter_cache_yf() -> diskcache.Cache:
+    """Abre o cache em disco uma única vez por processo"""
+    return diskcache.Cache(".cache/yf")
+
+# Histórico e `info` (que traz preço, preço-alvo e recomendação) expiram juntos: 1 dia
+_TTL_DADOS = 24 * 60 * 60
+
+# Versão do formato do resultado de get_technical_data; incrementar ao mudar sua estrutura
+_VERSAO_DADOS = 2
+
+# O histórico é sempre baixado no maior período e recortado localmente para o período escolhido
+_PERIODO_COMPLETO = '5y'
+_PERIOD_DAYS = {'1mo': 31, '3mo': 92, '6mo': 183, '1y': 366, '2y': 731, '5y': 1827}
+
+@st.cache_resource
+def _criar_sessao_http():
+    """Cria uma única vez por processo a sessão HTTP compartilhada pelas chamadas ao Yahoo Finance"""
+    if curl_requests is not None:
+        # Versões recentes do yfinance só aceitam sessões curl_cffi
+        return curl_requests.Session(impersonate="chrome")
+    # Sem curl_cffi, o yfinance instalado é anterior a essa exigência e aceita requests
+    return requests.Session()
+
+def _chave_cache(*partes) -> str:
+    """Gera a chave MD5 usada no cache em disco"""
+    return hashlib.md5("|".join(str(p) for p in partes).encode()).hexdigest()
+
+def _obter_info(ticker: str) -> Optional[dict]:
+    """Obtém o dicionário `info` de uma ação, consultando o cache em disco antes da rede"""
+    chave = _chave_cache("info", ticker, date.today())
+    info = _obter_cache_yf().get(chave)
+    if info is None:
+        try:
+            info = yf.Ticker(ticker, session=_criar_sessao_http()).info
+        except Exception as e:
+            logger.warning("Erro ao obter informações fundamentais para %s: %s", ticker, e)
+            return None
+        if info:
+            _obter_cache_yf().set(chave, info, expire=_TTL_DADOS)
+    return info
+
+def _baixar_historicos(tickers: list, period: str) -> Dict[str, pd.DataFrame]:
+    """Baixa o histórico de preços de várias ações em uma única chamada a yf.download"""
+    try:
+        dados = yf.download(tickers, period=period, group_by='ticker', threads=True,
+                            progress=False, session=_criar_sessao_http())
+    except Exception as e:
+        logger.warning("Erro ao obter histórico para %s: %s", ", ".join(tickers), e)
+        return {}
+    
+    if isinstance(dados.columns, pd.MultiIndex):
+        por_ticker = {ticker: dados[ticker] for ticker in tickers
+                      if ticker in dados.columns.get_level_values(0)}
+    elif len(tickers) == 1 and 'Close' in dados.columns:
+        # Versões antigas do yfinance devolvem colunas simples ao baixar um único símbolo
+        por_ticker = {tickers[0]: dados}
+    else:
+        por_ticker = {}
+    
+    historicos = {}
+    for ticker, hist in por_ticker.items():
+        # Descarta as datas em que apenas as outras ações foram negociadas
+        hist = hist.dropna(subset=['Close'])
+        if not hist.empty:
+            historicos[ticker] = hist[['Close', 'Volume']]
+    return historicos
+
+def _obter_historicos(tickers: list) -> Dict[str, pd.DataFrame]:
+    """Obtém o histórico completo (5y) das ações, baixando em uma única requisição só os ausentes do cache"""
+    chaves = {ticker: _chave_cache("hist", ticker, _PERIODO_COMPLETO, date.today()) for ticker in tickers}
+    historicos = {}
+    for ticker in tickers:
+        hist = _obter_cache_yf().get(chaves[ticker])
+        if hist is not None:
+            historicos[ticker] = hist
+    
+    ausentes = [ticker for ticker in tickers if ticker not in historicos]
+    if ausentes:
+        for ticker, hist in _baixar_historicos(ausentes, _PERIODO_COMPLETO).items():
+            _obter_cache_yf().set(chaves[ticker], hist, expire=_TTL_DADOS)
+            historicos[ticker] = hist
+    return historicos
+
+def _recortar_periodo(hist: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Recorta localmente o histórico completo para o período solicitado"""
+    dias = _PERIOD_DAYS.get(period)
+    if dias is None:
+        return hist
+    inicio = pd.Timestamp.now(tz=hist.index.tz) - pd.Timedelta(days=dias)
+    return hist.loc[hist.index >= inicio]
 
 # Configuração do cliente Mistral 7B
 def get_mistral_client(api_key: str) -> OpenAI:
@@ -23,181 +138,288 @@ class AgentState(TypedDict):
     acao2: str
     api_key: str
     dados_tecnicos: dict
+    resumo_struct: dict
     periodo: str
 
-# Função para validar símbolos de ações
-def validar_simbolo(ticker: str) -> bool:
-    """Verifica se um símbolo de ação é válido no Yahoo Finance"""
-    try:
-        acao = yf.Ticker(ticker)
-        # Tenta obter informações básicas
-        info = acao.info
-        return info is not None and len(info) > 0
-    except Exception:
-        return False
-
-# Função para obter dados técnicos das ações com tratamento robusto de erros
-def get_technical_data(ticker: str, period: str = '1y') -> Optional[dict]:
+# Campos fundamentais extraídos do `info` do Yahoo Finance: (chave no resultado, campo no info)
+_CAMPOS_FUNDAMENTAIS = (
+    ('currentPrice', 'currentPrice'),
+    ('targetMeanPrice', 'targetMeanPrice'),
+    ('recommendationMean', 'recommendationMean'),
+    ('dividendYield', 'dividendYield'),
+    ('peRatio', 'trailingPE'),
+    ('beta', 'beta'),
+    ('marketCap', 'marketCap'),
+)
+
+# Função para obter dados de várias ações com cache e o mínimo de requisições
+def _obter_dados_acoes(tickers: list, period: str) -> Dict[str, Optional[dict]]:
     """
-    Obtém dados técnicos e fundamentais de uma ação com tratamento completo de erros
+    Obtém dados técnicos e fundamentais de várias ações, consultando o cache em disco antes da rede
     
     Args:
-        ticker: Símbolo da ação (ex: PETR4.SA)
+        tickers: Símbolos das ações (ex: ['PETR4.SA', 'VALE3.SA'])
         period: Período dos dados históricos (1mo, 3mo, 6mo, 1y, 2y, 5y)
     
+    Returns:
+        Dicionário ticker -> resultado de get_technical_data (None em caso de erro)
+    """
+    tickers = list(dict.fromkeys(tickers))
+    
+    # Reaproveita a análise já feita hoje para o mesmo par (ticker, período)
+    chaves = {ticker: _chave_cache("dados", _VERSAO_DADOS, ticker, period, date.today()) for ticker in tickers}
+    resultados = {ticker: _obter_cache_yf().get(chaves[ticker]) for ticker in tickers}
+    pendentes = [ticker for ticker in tickers if resultados[ticker] is None]
+    if not pendentes:
+        return resultados
+    
+    # O `info` é obtido por ação, em paralelo, enquanto o histórico vem em uma única requisição
+    with ThreadPoolExecutor(max_workers=len(pendentes)) as executor:
+        futuros_info = {ticker: executor.submit(_obter_info, ticker) for ticker in pendentes}
+        
+        # Uma única requisição serve todos os períodos; o recorte é feito localmente
+        historicos = _obter_historicos(pendentes)
+        
+        infos = {ticker: futuro.result() for ticker, futuro in futuros_info.items()}
+    
+    for ticker in pendentes:
+        hist = _recortar_periodo(historicos[ticker], period) if ticker in historicos else None
+        if hist is None or hist.empty:
+            logger.warning("Dados históricos vazios para %s no período %s", ticker, period)
+            continue
+        dados = get_technical_data(ticker, hist, infos[ticker])
+        if dados is not None:
+            _obter_cache_yf().set(chaves[ticker], dados, expire=_TTL_DADOS)
+        resultados[ticker] = dados
+    
+    return resultados
+
+# Função para calcular dados técnicos das ações com tratamento robusto de erros
+def get_technical_data(ticker: str, hist: pd.DataFrame, info: Optional[dict]) -> Optional[dict]:
+    """
+    Calcula dados técnicos e fundamentais de uma ação com tratamento completo de erros
+    
+    Args:
+        ticker: Símbolo da ação (ex: PETR4.SA)
+        hist: Histórico de preços da ação (com as colunas Close e Volume)
+        info: Dicionário `info` do Yahoo Finance para a ação
+    
     Returns:
         Dicionário com dados históricos, fundamentais e informações ou None em caso de erro
     """
     try:
-        acao = yf.Ticker(ticker)
-        
-        # Obtém dados históricos com fallback para períodos menores se necessário
-        try:
-            hist = acao.history(period=period)
-            if hist.empty:
-                # Tenta um período menor se o solicitado não retornar dados
-                fallback_period = '3mo' if period in ['1y', '2y', '5y'] else '1mo'
-                hist = acao.history(period=fallback_period)
-                if hist.empty:
-                    print(f"Dados históricos vazios para {ticker} mesmo com fallback")
-                    return None
-        except Exception as e:
-            print(f"Erro ao obter histórico para {ticker}: {e}")
+        if not info:
+            logger.warning("Nenhuma informação fundamental disponível para %s", ticker)
             return None
         
-        # Obtém informações fundamentais com tratamento de erro
-        try:
-            info = acao.info
-            if not info:
-                print(f"Nenhuma informação fundamental disponível para {ticker}")
-                return None
-        except Exception as e:
-            print(f"Erro ao obter informações fundamentais para {ticker}: {e}")
-            return None
+        # Mantém apenas as colunas usadas (gráficos e volume médio), em float32/uint64,
+        # reduzindo a memória, o cache em disco e o payload enviado ao Plotly
+        hist = hist[['Close', 'Volume']].copy()
+        hist['Close'] = hist['Close'].astype('float32')
+        hist['Volume'] = hist['Volume'].fillna(0).astype('uint64')
         
         # Cálculo de indicadores técnicos com verificação de dados suficientes
+        n = len(hist)
+        indicators = {'has_sma50': False, 'has_sma200': False, 'has_rsi': False}
         try:
-            if len(hist) >= 50:
-                hist['SMA_50'] = hist['Close'].rolling(window=50).mean()
-            if len(hist) >= 200:
-                hist['SMA_200'] = hist['Close'].rolling(window=200).mean()
-            if len(hist) >= 14:
-                hist['RSI'] = compute_rsi(hist['Close'])
+            close = hist['Close'].to_numpy()
+            if n >= 50:
+                hist['SMA_50'] = _sma(close, 50).astype('float32')
+                indicators['has_sma50'] = True
+            if n >= 200:
+                hist['SMA_200'] = _sma(close, 200).astype('float32')
+                indicators['has_sma200'] = True
+            if n >= 14:
+                hist['RSI'] = compute_rsi(hist['Close']).astype('float32')
+                indicators['has_rsi'] = True
         except Exception as e:
-            print(f"Erro ao calcular indicadores técnicos para {ticker}: {e}")
+            logger.warning("Erro ao calcular indicadores técnicos para %s: %s", ticker, e)
         
         # Informações fundamentais com fallback para 'N/A' quando não disponível
-        fundamentals = {
-            'currentPrice': info.get('currentPrice', 'N/A'),
-            'targetMeanPrice': info.get('targetMeanPrice', 'N/A'),
-            'recommendationMean': info.get('recommendationMean', 'N/A'),
-            'dividendYield': info.get('dividendYield', 'N/A'),
-            'peRatio': info.get('trailingPE', 'N/A'),
-            'beta': info.get('beta', 'N/A'),
-            'marketCap': info.get('marketCap', 'N/A'),
-            'volume': hist['Volume'].mean() if not hist['Volume'].empty else 'N/A'
-        }
+        fundamentals = {chave: info.get(campo, 'N/A') for chave, campo in _CAMPOS_FUNDAMENTAIS}
+        fundamentals['volume'] = float(np.mean(hist['Volume'].to_numpy())) if n else 'N/A'
+        # Preço atual vem do mesmo histórico exibido no gráfico, para os dois não divergirem
+        if n:
+            fundamentals['currentPrice'] = float(hist['Close'].iat[-1])
         
         return {
             'historical': hist,
+            'indicators': indicators,
             'fundamentals': fundamentals,
             'info': info
         }
     except Exception as e:
-        print(f"Erro geral ao obter dados para {ticker}: {e}")
+        logger.warning("Erro geral ao obter dados para %s: %s", ticker, e)
         return None
 
+# Janela a partir da qual a média móvel usa somas acumuladas em vez de janelas deslizantes
+_JANELA_MAX_DESLIZANTE = 64
+
+# Média móvel simples vetorizada
+def _sma(valores: np.ndarray, window: int) -> np.ndarray:
+    """Calcula a média móvel simples, com NaN nas primeiras `window - 1` posições"""
+    if window <= _JANELA_MAX_DESLIZANTE:
+        # Janelas curtas: redução direta sobre uma view das janelas (sem cópia, sem erro acumulado)
+        sma = sliding_window_view(valores, window).mean(axis=1, dtype=np.float64)
+    else:
+        # Janelas longas: O(N) via diferença de somas acumuladas
+        cs = np.concatenate(([0.0], np.cumsum(valores, dtype=np.float64)))
+        sma = (cs[window:] - cs[:-window]) / window
+    return np.concatenate((np.full(window - 1, np.nan), sma))
+
+# Laço do RSI de Wilder, compilado com numba
+def _rsi_wilder(close: np.ndarray, window: int) -> np.ndarray:
+    """Média simples de ganhos/perdas na primeira janela e suavização de Wilder em seguida"""
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    if n <= window:
+        return out
+    
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, n):
+        delta = close[i] - close[i - 1]
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if i <= window:
+            avg_gain += gain / window
+            avg_loss += loss / window
+            if i < window:
+                continue
+        else:
+            avg_gain = (avg_gain * (window - 1) + gain) / window
+            avg_loss = (avg_loss * (window - 1) + loss) / window
+        
+        if avg_loss > 0:
+            out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        elif avg_gain > 0:
+            out[i] = 100.0
+    return out
+
+# RSI de Wilder vetorizado, usado quando o numba não está instalado
+def _rsi_ewm(close: np.ndarray, window: int) -> np.ndarray:
+    """Mesmo resultado de `_rsi_wilder`, com a suavização feita pela EWM do pandas"""
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    if n <= window:
+        return out
+    
+    delta = np.diff(close)
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    
+    # A média da primeira janela semeia a EWM; com adjust=False ela reproduz a recursão de Wilder
+    def suavizar(valores):
+        serie = pd.Series(np.concatenate(([valores[:window].mean()], valores[window:])))
+        return serie.ewm(alpha=1 / window, adjust=False).mean().to_numpy()
+    
+    avg_gain = suavizar(gains)
+    avg_loss = suavizar(losses)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    out[window:] = np.where(avg_loss > 0, rsi, np.where(avg_gain > 0, 100.0, np.nan))
+    return out
+
+# Sem numba o laço seria interpretado elemento a elemento, mais lento que a EWM vetorizada
+_calcular_rsi = njit(cache=True)(_rsi_wilder) if njit is not None else _rsi_ewm
+
 # Cálculo do RSI com tratamento de erro
 def compute_rsi(prices: pd.Series, window: int = 14) -> pd.Series:
-    """Calcula o Relative Strength Index (RSI)"""
+    """Calcula o Relative Strength Index (RSI) com a suavização de Wilder (RMA)"""
     try:
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
+        rsi = _calcular_rsi(prices.to_numpy(dtype=np.float64), window)
+        return pd.Series(rsi, index=prices.index, name='RSI')
     except Exception as e:
-        print(f"Erro ao calcular RSI: {e}")
+        logger.warning("Erro ao calcular RSI: %s", e)
         return pd.Series(index=prices.index, name='RSI')
 
+# Formato aceito para símbolos do Yahoo Finance (ex: PETR4.SA, ^BVSP, BRL=X)
+_PADRAO_SIMBOLO = re.compile(r"[A-Z0-9.\-^=]{1,12}")
+
+# Exemplo exibido na mensagem de símbolo inválido de cada campo do estado
+_EXEMPLOS_SIMBOLO = (("acao1", "PETR4.SA para Petrobras"), ("acao2", "VALE3.SA para Vale"))
+
+def _erro_simbolo_invalido(ticker: str, exemplo: str) -> AIMessage:
+    """Mensagem padrão para símbolos malformados ou não encontrados no Yahoo Finance"""
+    return AIMessage(
+        content=f"Erro: Símbolo {ticker} inválido ou não encontrado. "
+               f"Verifique se o símbolo está correto (ex: {exemplo})."
+    )
+
+# Campos fundamentais do resumo (exibido na interface e enviado ao modelo): (chave, rótulo)
+_CAMPOS_RESUMO = (
+    ('currentPrice', 'Preço Atual'),
+    ('targetMeanPrice', 'Média de Preço Alvo'),
+    ('recommendationMean', 'Recomendação Média'),
+    ('dividendYield', 'Dividend Yield'),
+    ('peRatio', 'P/E Ratio'),
+    ('volume', 'Volume Médio'),
+)
+
+def _valor_compacto(value):
+    """Arredonda números para 2 casas e troca ausentes por 'N/A', reduzindo tokens no prompt"""
+    if isinstance(value, float):
+        return round(value, 2) if not pd.isna(value) else 'N/A'
+    return value if value is not None else 'N/A'
+
+def _formatar_resumo(resumo_struct: dict) -> str:
+    """Monta o resumo em markdown a partir do resumo estruturado"""
+    linhas = [f"## Dados Técnicos Coletados (Período: {resumo_struct['periodo']})"]
+    for ticker, valores in resumo_struct['acoes'].items():
+        linhas.append(f"\n**{ticker}**")
+        for chave, rotulo in _CAMPOS_RESUMO:
+            valor = valores[chave]
+            linhas.append(f"- {rotulo}: {valor:.2f}" if isinstance(valor, float) else f"- {rotulo}: {valor}")
+    return "\n".join(linhas)
+
 # Nó de pesquisa com yfinance com validação e tratamento robusto
 def pesquisar_acoes(state: AgentState) -> AgentState:
     """Pesquisa dados de ações com validação e tratamento completo de erros"""
     state.setdefault("messages", [])
     state.setdefault("dados_tecnicos", {})
+    state.setdefault("resumo_struct", {})
     state.setdefault("periodo", "1y")
     
+    # Normaliza os símbolos para que variações (espaços, minúsculas) usem as mesmas chaves de cache
+    state["acao1"] = (state["acao1"] or "").strip().upper()
+    state["acao2"] = (state["acao2"] or "").strip().upper()
+    
     # Validação de entrada
     if not state["acao1"] or not state["acao2"]:
         state["messages"].append(AIMessage(content="Erro: Símbolos das ações não fornecidos"))
         return state
     
-    # Validação dos símbolos antes de pesquisar
-    if not validar_simbolo(state["acao1"]):
-        state["messages"].append(AIMessage(
-            content=f"Erro: Símbolo {state['acao1']} inválido ou não encontrado. "
-                   f"Verifique se o símbolo está correto (ex: PETR4.SA para Petrobras)."
-        ))
-        return state
-    
-    if not validar_simbolo(state["acao2"]):
-        state["messages"].append(AIMessage(
-            content=f"Erro: Símbolo {state['acao2']} inválido ou não encontrado. "
-                   f"Verifique se o símbolo está correto (ex: VALE3.SA para Vale)."
-        ))
-        return state
+    # Rejeita símbolos malformados sem nenhuma chamada ao Yahoo Finance
+    for chave, exemplo in _EXEMPLOS_SIMBOLO:
+        if not _PADRAO_SIMBOLO.fullmatch(state[chave]):
+            state["messages"].append(_erro_simbolo_invalido(state[chave], exemplo))
+            return state
     
     try:
-        # Obter dados para ambas as ações
-        dados_acao1 = get_technical_data(state["acao1"], state["periodo"])
-        dados_acao2 = get_technical_data(state["acao2"], state["periodo"])
+        # Obter dados para ambas as ações (histórico das duas em uma única requisição)
+        dados = _obter_dados_acoes([state["acao1"], state["acao2"]], state["periodo"])
         
-        # Verificar se os dados foram obtidos com sucesso
-        if dados_acao1 is None:
-            state["messages"].append(AIMessage(
-                content=f"Erro: Não foi possível obter dados completos para {state['acao1']}. "
-                       f"Alguns dados podem não estar disponíveis para esta ação."
-            ))
-            return state
-            
-        if dados_acao2 is None:
-            state["messages"].append(AIMessage(
-                content=f"Erro: Não foi possível obter dados completos para {state['acao2']}. "
-                       f"Alguns dados podem não estar disponíveis para esta ação."
-            ))
-            return state
+        # Sem dados (histórico ou `info` vazios) indica símbolo inválido
+        for chave, exemplo in _EXEMPLOS_SIMBOLO:
+            if dados[state[chave]] is None:
+                state["messages"].append(_erro_simbolo_invalido(state[chave], exemplo))
+                return state
         
         # Armazenar dados técnicos
         state["dados_tecnicos"] = {
-            state["acao1"]: dados_acao1,
-            state["acao2"]: dados_acao2
+            state["acao1"]: dados[state["acao1"]],
+            state["acao2"]: dados[state["acao2"]]
         }
         
-        # Preparar resumo dos dados com verificação de valores
-        def format_value(value):
-            if isinstance(value, float):
-                return f"{value:.2f}" if not pd.isna(value) else "N/A"
-            return str(value) if value is not None else "N/A"
-        
-        resumo = f"""
-        ## Dados Técnicos Coletados (Período: {state['periodo']})
-        
-        **{state["acao1"]}**
-        - Preço Atual: {format_value(dados_acao1['fundamentals']['currentPrice'])}
-        - Média de Preço Alvo: {format_value(dados_acao1['fundamentals']['targetMeanPrice'])}
-        - Recomendação Média: {format_value(dados_acao1['fundamentals']['recommendationMean'])}
-        - Dividend Yield: {format_value(dados_acao1['fundamentals']['dividendYield'])}
-        - P/E Ratio: {format_value(dados_acao1['fundamentals']['peRatio'])}
-        - Volume Médio: {format_value(dados_acao1['fundamentals']['volume'])}
-        
-        **{state["acao2"]}**
-        - Preço Atual: {format_value(dados_acao2['fundamentals']['currentPrice'])}
-        - Média de Preço Alvo: {format_value(dados_acao2['fundamentals']['targetMeanPrice'])}
-        - Recomendação Média: {format_value(dados_acao2['fundamentals']['recommendationMean'])}
-        - Dividend Yield: {format_value(dados_acao2['fundamentals']['dividendYield'])}
-        - P/E Ratio: {format_value(dados_acao2['fundamentals']['peRatio'])}
-        - Volume Médio: {format_value(dados_acao2['fundamentals']['volume'])}
-        """
+        # Resumo estruturado, reutilizado no markdown da interface e no prompt do modelo
+        state["resumo_struct"] = {
+            'periodo': state['periodo'],
+            'acoes': {
+                ticker: {chave: _valor_compacto(dados['fundamentals'].get(chave)) for chave, _ in _CAMPOS_RESUMO}
+                for ticker, dados in state["dados_tecnicos"].items()
+            }
+        }
+        resumo = _formatar_resumo(state["resumo_struct"])
         
         state["messages"].append(AIMessage(content=resumo))
         
@@ -209,6 +431,12 @@ def pesquisar_acoes(state: AgentState) -> AgentState:
     
     return state
 
+def _tokens_relatorio(response):
+    """Extrai o texto de cada chunk da resposta em streaming do modelo"""
+    for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
 # Nó de geração de relatório com tratamento de erro melhorado
 def gerar_relatorio(state: AgentState) -> AgentState:
     """Gera relatório comparativo com tratamento robusto de erros"""
@@ -226,10 +454,11 @@ def gerar_relatorio(state: AgentState) -> AgentState:
         client = get_mistral_client(state["api_key"])
         
         # Preparar prompt detalhado com fallback para dados ausentes
-        dados_disponiveis = state["messages"][-1].content if state["messages"] else "Dados limitados disponíveis"
+        dados_disponiveis = (json.dumps(state["resumo_struct"], separators=(',', ':'), ensure_ascii=False)
+                             if state.get("resumo_struct") else "Dados limitados disponíveis")
         
         prompt = f"""
-        Você é um analista financeiro especializado. Analise comparativamente as ações {state["acao1"]} e {state["acao2"]} com base nos seguintes dados:
+        Você é um analista financeiro especializado. Analise comparativamente as ações {state["acao1"]} e {state["acao2"]} com base nos seguintes dados (JSON):
         
         {dados_disponiveis}
         
@@ -254,10 +483,18 @@ def gerar_relatorio(state: AgentState) -> AgentState:
             model="mistralai/mistral-7b-instruct:free",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
-            max_tokens=2000
+            max_tokens=2000,
+            stream=True
         )
         
-        relatorio = response.choices[0].message.content
+        # Exibe o relatório à medida que os tokens chegam (enviando só o incremento)
+        placeholder = st.empty()
+        try:
+            with placeholder.container():
+                relatorio = st.write_stream(_tokens_relatorio(response))
+        finally:
+            # A prévia é removida, mesmo se o streaming falhar, pois a interface exibe todas as mensagens ao final
+            placeholder.empty()
         state["messages"].append(AIMessage(content=relatorio))
         
     except Exception as e:
@@ -268,6 +505,37 @@ def gerar_relatorio(state: AgentState) -> AgentState:
     
     return state
 
+# Gráficos de uma ação, memoizados por (ticker, últimas datas, tamanho do histórico)
+@st.cache_data(ttl=900, show_spinner=False,
+               hash_funcs={pd.DataFrame: lambda d: hash(tuple(d.index[-5:].astype(str)) + (len(d),))})
+def _criar_figuras(ticker: str, hist: pd.DataFrame, indicators: dict) -> tuple:
+    """Cria o gráfico de preços e, se houver RSI calculado, o gráfico de RSI de uma ação"""
+    # Arrays passados direto ao Plotly (WebGL), sem reset_index nem introspecção do DataFrame
+    x = hist.index.to_numpy()
+    
+    # Gráfico de preços com médias móveis (se disponíveis)
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(x=x, y=hist['Close'].to_numpy(), mode='lines', name='Close'))
+    fig.update_layout(title=f'Preço - {ticker}', xaxis_title='Date',
+                      yaxis_title='Preço', legend_title_text='Indicador')
+    
+    # Adiciona médias móveis se calculadas
+    if indicators['has_sma50']:
+        fig.add_trace(go.Scattergl(x=x, y=hist['SMA_50'].to_numpy(), mode='lines', name='SMA 50'))
+    if indicators['has_sma200']:
+        fig.add_trace(go.Scattergl(x=x, y=hist['SMA_200'].to_numpy(), mode='lines', name='SMA 200'))
+    
+    # Gráfico de RSI se calculado
+    fig_rsi = None
+    if indicators['has_rsi']:
+        fig_rsi = go.Figure()
+        fig_rsi.add_trace(go.Scattergl(x=x, y=hist['RSI'].to_numpy(), mode='lines', name='RSI'))
+        fig_rsi.update_layout(title=f'RSI - {ticker}', xaxis_title='Date', yaxis_title='RSI')
+        fig_rsi.add_hline(y=70, line_dash="dash", line_color="red", annotation_text="Sobrevendido")
+        fig_rsi.add_hline(y=30, line_dash="dash", line_color="green", annotation_text="Sobrecomprado")
+    
+    return fig, fig_rsi
+
 # Criar visualizações gráficas com tratamento robusto
 def criar_graficos(dados_tecnicos: dict) -> list:
     """Cria gráficos Plotly a partir dos dados técnicos"""
@@ -275,36 +543,29 @@ def criar_graficos(dados_tecnicos: dict) -> list:
     
     for ticker, dados in dados_tecnicos.items():
         if dados and 'historical' in dados and not dados['historical'].empty:
-            df = dados['historical'].reset_index()
-            
             try:
-                # Gráfico de preços com médias móveis (se disponíveis)
-                fig = px.line(df, x='Date', y=['Close'], 
-                             title=f'Preço - {ticker}',
-                             labels={'value': 'Preço', 'variable': 'Indicador'})
-                
-                # Adiciona médias móveis se calculadas
-                if 'SMA_50' in df.columns:
-                    fig.add_scatter(x=df['Date'], y=df['SMA_50'], name='SMA 50')
-                if 'SMA_200' in df.columns:
-                    fig.add_scatter(x=df['Date'], y=df['SMA_200'], name='SMA 200')
-                
+                fig, fig_rsi = _criar_figuras(ticker, dados['historical'], dados['indicators'])
                 graficos.append(fig)
-                
-                # Gráfico de RSI se calculado
-                if 'RSI' in df.columns:
-                    fig_rsi = px.line(df, x='Date', y=['RSI'], 
-                                    title=f'RSI - {ticker}',
-                                    labels={'value': 'RSI'})
-                    fig_rsi.add_hline(y=70, line_dash="dash", line_color="red", annotation_text="Sobrevendido")
-                    fig_rsi.add_hline(y=30, line_dash="dash", line_color="green", annotation_text="Sobrecomprado")
+                if fig_rsi is not None:
                     graficos.append(fig_rsi)
                     
             except Exception as e:
-                print(f"Erro ao criar gráficos para {ticker}: {e}")
+                logger.warning("Erro ao criar gráficos para %s: %s", ticker, e)
     
     return graficos if graficos else None
 
+# Workflow compilado uma única vez e reutilizado em todos os cliques
+@st.cache_resource
+def _get_workflow():
+    """Monta e compila o grafo pesquisar -> gerar_relatorio"""
+    workflow = Graph()
+    workflow.add_node("pesquisar", pesquisar_acoes)
+    workflow.add_node("gerar_relatorio", gerar_relatorio)
+    workflow.set_entry_point("pesquisar")
+    workflow.add_edge("pesquisar", "gerar_relatorio")
+    workflow.set_finish_point("gerar_relatorio")
+    return workflow.compile()
+
 # Interface Streamlit melhorada
 def main():
     """Interface principal do aplicativo"""
@@ -357,25 +618,17 @@ def main():
             
         with st.spinner("Coletando dados e gerando análise..."):
             try:
-                # Criar e executar workflow
-                workflow = Graph()
-                workflow.add_node("pesquisar", pesquisar_acoes)
-                workflow.add_node("gerar_relatorio", gerar_relatorio)
-                workflow.set_entry_point("pesquisar")
-                workflow.add_edge("pesquisar", "gerar_relatorio")
-                workflow.set_finish_point("gerar_relatorio")
-                compiled_workflow = workflow.compile()
-                
                 estado_inicial = AgentState(
                     messages=[],
                     acao1=acao1,
                     acao2=acao2,
                     api_key=api_key,
                     dados_tecnicos={},
+                    resumo_struct={},
                     periodo=periodo
                 )
                 
-                resultado = compiled_workflow.invoke(estado_inicial)
+                resultado = _get_workflow().invoke(estado_inicial)
                 
                 # Exibir resultados
                 if resultado["messages"]: